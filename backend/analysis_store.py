@@ -0,0 +1,75 @@
+# analysis_store.py - Bounded storage for analysis results between requests
+
+from typing import Dict, Any, Optional
+import json
+from cachetools import TTLCache
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # Redis is only needed for multi-worker deployments
+    redis = None
+
+
+class AnalysisStore:
+    """
+    Store JSON-serializable records with a size cap and expiry
+
+    Records live in an in-process TTL/LRU cache by default. When a Redis URL
+    is given they are stored in Redis instead, so every uvicorn worker sees
+    the same records and they survive restarts.
+    """
+
+    def __init__(self,
+                 prefix: str,
+                 maxsize: int = 1000,
+                 ttl_seconds: int = 3600,
+                 redis_url: str = ""):
+        self.prefix = prefix
+        self.ttl_seconds = ttl_seconds
+
+        self._redis = None
+        self._memory = None
+        if redis_url:
+            if redis is None:
+                raise ValueError(
+                    "REDIS_URL is set but the redis package is not installed"
+                )
+            self._redis = redis.Redis.from_url(redis_url)
+        else:
+            self._memory = TTLCache(maxsize=maxsize, ttl=ttl_seconds)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the record for key, or None if missing or expired"""
+        if self._redis is None:
+            return self._memory.get(key)
+
+        value = await self._redis.get(self._redis_key(key))
+        return json.loads(value) if value is not None else None
+
+    async def set(self, key: str, record: Dict[str, Any]) -> None:
+        """Store a record, replacing any existing one"""
+        if self._redis is None:
+            self._memory[key] = record
+            return
+
+        await self._redis.set(
+            self._redis_key(key), json.dumps(record), ex=self.ttl_seconds
+        )
+
+    async def count(self) -> int:
+        """Number of records currently stored"""
+        if self._redis is None:
+            return len(self._memory)
+
+        total = 0
+        async for _ in self._redis.scan_iter(match=self._redis_key("*")):
+            total += 1
+        return total
+
+    async def close(self) -> None:
+        """Close the Redis connection, if any"""
+        if self._redis is not None:
+            await self._redis.aclose()
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
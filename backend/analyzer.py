@@ -1,76 +1,35 @@
 # analyzer.py - Core protocol analysis using Claude API
 
-from anthropic import Anthropic
-from typing import List, Dict, Any
+from anthropic import AsyncAnthropic, AsyncAnthropicBedrock, DefaultAsyncHttpxClient
+from typing import List, Dict, Any, Tuple, AsyncIterator, Optional
+import asyncio
 import json
-from config import settings
+import operator
+import httpx
+from config import settings, Priority
+from llm_cache import LLMCache
 
-class ProtocolAnalyzer:
-    """Analyze laboratory protocols and suggest improvements using Claude AI"""
-    
-    def __init__(self):
-        """Initialize the analyzer with Claude API client"""
-        self.client = Anthropic(api_key=settings.ANTHROPIC_API_KEY)
-        self.model = settings.ANTHROPIC_MODEL
-        
-    def analyze_protocol(self, protocol_text: str, filename: str = "") -> Dict[str, Any]:
-        """
-        Analyze a protocol and return structured improvement suggestions
-        
-        Args:
-            protocol_text: The full text of the protocol
-            filename: Optional filename for reference
-            
-        Returns:
-            Dictionary containing analysis results and suggestions
-        """
-        
-        # Create the analysis prompt
-        prompt = self._create_analysis_prompt(protocol_text, filename)
-        
-        try:
-            # Call Claude API
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=settings.MAX_TOKENS,
-                temperature=settings.TEMPERATURE,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
-            )
-            
-            # Extract the response text
-            response_text = response.content[0].text
-            
-            # Parse the structured response
-            analysis_result = self._parse_analysis_response(response_text)
-            
-            # Add metadata
-            analysis_result['metadata'] = {
-                'filename': filename,
-                'model_used': self.model,
-                'protocol_length': len(protocol_text),
-                'tokens_used': response.usage.input_tokens + response.usage.output_tokens
-            }
-            
-            return analysis_result
-            
-        except Exception as e:
-            return {
-                'error': True,
-                'message': f"Analysis failed: {str(e)}",
-                'suggestions': []
-            }
+# orjson parses Claude's JSON about twice as fast as the stdlib; its
+# JSONDecodeError subclasses json.JSONDecodeError so error handling is shared
+try:
+    import orjson
     
-    def _create_analysis_prompt(self, protocol_text: str, filename: str = "") -> str:
-        """Create the prompt for Claude to analyze the protocol"""
-        
-        prompt = f"""You are an expert laboratory protocol reviewer. Analyze the following laboratory protocol and identify specific improvements.
+    def _loads(text):
+        return orjson.loads(text.encode() if isinstance(text, str) else text)
+except ImportError:
+    _loads = json.loads
+
+_JSON_DECODER = json.JSONDecoder()
+
+# Sort rank for each priority name; unknown priorities sort last
+_PRIORITY_ORDER = {priority.name: int(priority) for priority in Priority}
+_UNKNOWN_PRIORITY = len(_PRIORITY_ORDER)
+_PRIO_KEY = operator.itemgetter('_prio')
+
 
-{"Protocol File: " + filename if filename else ""}
+# Static part of the analysis prompt. It is identical for every request,
+# so it is sent as the system prompt and only the protocol varies.
+STATIC_RUBRIC = """You are an expert laboratory protocol reviewer. Analyze the laboratory protocol provided by the user and identify specific improvements.
 
 For each issue you find, provide:
 1. The category (safety, clarity, completeness, formatting, or best_practices)
@@ -87,29 +46,469 @@ Focus on:
 - **Best Practices**: Industry standards, optimization opportunities, quality controls
 
 Return your analysis in this exact JSON format:
-{{
+{
     "summary": "Brief overview of the protocol and overall assessment",
     "overall_score": "A score from 1-10",
     "total_issues": "Total number of issues found",
     "suggestions": [
-        {{
+        {
             "category": "safety|clarity|completeness|formatting|best_practices",
             "priority": "HIGH|MEDIUM|LOW",
             "location": "Step 3" or "Materials section" etc,
             "issue": "Clear description of what's wrong",
             "suggestion": "Specific recommendation to fix it",
             "example": "Optional: How it should look after the fix"
-        }}
+        }
     ]
-}}
+}
+
+Provide your analysis in valid JSON format only, with no additional text before or after."""
+
+# Per-request part of the analysis prompt
+_ANALYSIS_PROMPT_TEMPLATE = """{filename_line}
 
 Protocol to analyze:
 
-{protocol_text}
+{protocol_text}"""
 
-Provide your analysis in valid JSON format only, with no additional text before or after."""
+_IMPROVE_PROMPT_TEMPLATE = """You are a laboratory protocol editor. Please rewrite this protocol incorporating the following improvements:
 
-        return prompt
+{suggestions_text}
+
+Maintain the original structure and style, but integrate these improvements naturally. Make the protocol clearer and safer while keeping it professional.
+
+Original Protocol:
+{original_text}
+
+Provide the improved protocol below:"""
+
+class SuggestionStreamParser:
+    """Pull complete suggestion objects out of a partially streamed analysis response"""
+    
+    def __init__(self):
+        self._buffer = ""
+        self._pos = -1  # Scan position inside the suggestions array, -1 until found
+        self._depth = 0
+        self._object_start = 0
+        self._in_string = False
+        self._escape = False
+        self._done = False
+    
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """
+        Add streamed text and return any suggestions completed by it
+        
+        Args:
+            text: Next chunk of Claude's response
+            
+        Returns:
+            Suggestion dictionaries whose closing brace arrived in this chunk
+        """
+        
+        self._buffer += text
+        suggestions = []
+        
+        if self._done:
+            return suggestions
+        
+        # Wait until the opening bracket of the suggestions array has arrived
+        if self._pos == -1:
+            key_start = self._buffer.find('"suggestions"')
+            if key_start == -1:
+                return suggestions
+            array_start = self._buffer.find('[', key_start)
+            if array_start == -1:
+                return suggestions
+            self._pos = array_start + 1
+        
+        # Brace-balanced scan; string contents never change the depth
+        buffer = self._buffer
+        while self._pos < len(buffer):
+            char = buffer[self._pos]
+            
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == '{':
+                if self._depth == 0:
+                    self._object_start = self._pos
+                self._depth += 1
+            elif char == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        suggestions.append(
+                            _loads(buffer[self._object_start:self._pos + 1])
+                        )
+                    except json.JSONDecodeError:
+                        pass  # Left for the full parse at the end
+            elif char == ']' and self._depth == 0:
+                self._done = True
+                break
+            
+            self._pos += 1
+        
+        return suggestions
+
+
+class ProtocolAnalyzer:
+    """Analyze laboratory protocols and suggest improvements using Claude AI"""
+    
+    def __init__(self):
+        """Initialize the analyzer with Claude API client"""
+        # HTTP/2 with a persistent pool so requests skip TCP/TLS setup
+        http_client = DefaultAsyncHttpxClient(
+            http2=True,
+            limits=httpx.Limits(
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS
+            ),
+            timeout=httpx.Timeout(
+                settings.HTTP_TIMEOUT_SECONDS,
+                connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS
+            )
+        )
+        
+        if settings.ANTHROPIC_PLATFORM == "bedrock":
+            self.client = AsyncAnthropicBedrock(
+                aws_region=settings.AWS_REGION,
+                http_client=http_client
+            )
+        else:
+            self.client = AsyncAnthropic(
+                api_key=settings.ANTHROPIC_API_KEY,
+                http_client=http_client
+            )
+        self._request_options = self._latency_options()
+        self.model = settings.ANTHROPIC_MODEL
+        self.fast_model = settings.ANTHROPIC_FAST_MODEL
+        self.cache = LLMCache(
+            max_entries=settings.CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.CACHE_TTL_SECONDS,
+            db_path=settings.CACHE_DB_PATH,
+            max_db_entries=settings.CACHE_DB_MAX_ENTRIES,
+            semantic=settings.SEMANTIC_CACHE_ENABLED,
+            embedding_model=settings.SEMANTIC_CACHE_MODEL,
+            similarity_threshold=settings.SEMANTIC_CACHE_THRESHOLD
+        )
+        
+        # Anthropic only caches prefixes above a per-model minimum (1024+
+        # tokens). The rubric is about 400 tokens today, so it is marked for
+        # caching only once it grows past settings.PROMPT_CACHE_MIN_TOKENS
+        # (estimated at 4 characters per token).
+        rubric_block = {"type": "text", "text": STATIC_RUBRIC}
+        self._prompt_caching = len(STATIC_RUBRIC) // 4 >= settings.PROMPT_CACHE_MIN_TOKENS
+        if self._prompt_caching:
+            rubric_block["cache_control"] = {"type": "ephemeral"}
+        self._system_blocks = [rubric_block]
+        
+    async def analyze_protocol(self, protocol_text: str, filename: str = "") -> Dict[str, Any]:
+        """
+        Analyze a protocol and return structured improvement suggestions
+        
+        Args:
+            protocol_text: The full text of the protocol
+            filename: Optional filename for reference
+            
+        Returns:
+            Dictionary containing analysis results and suggestions
+        """
+        
+        analysis_result = None
+        async for event in self.stream_analysis(protocol_text, filename):
+            if event['type'] == 'result':
+                analysis_result = event['result']
+        
+        return analysis_result
+    
+    async def stream_analysis(self, 
+                              protocol_text: str, 
+                              filename: str = "") -> AsyncIterator[Dict[str, Any]]:
+        """
+        Analyze a protocol, yielding each suggestion as soon as Claude has written it
+        
+        Args:
+            protocol_text: The full text of the protocol
+            filename: Optional filename for reference
+            
+        Yields:
+            {'type': 'suggestion', 'suggestion': {...}} events in generation order,
+            then one {'type': 'result', 'result': {...}} with the full analysis
+        """
+        
+        # Create the analysis prompt
+        prompt = self._create_analysis_prompt(protocol_text, filename)
+        model = self._select_model(protocol_text)
+        
+        # Return a cached result if this protocol was analyzed before
+        cache_key = self._cache_key(prompt, model)
+        cached = await self._cache_get(cache_key, protocol_text, model)
+        if cached is not None:
+            cached['metadata']['filename'] = filename
+            cached['metadata']['cache_hit'] = True
+            for suggestion in cached['suggestions']:
+                yield {'type': 'suggestion', 'suggestion': suggestion}
+            yield {'type': 'result', 'result': cached}
+            return
+        
+        try:
+            # Call Claude API, parsing suggestions while the response streams in
+            parser = SuggestionStreamParser()
+            async with self.client.messages.stream(
+                **self._analysis_params(prompt, model),
+                **self._request_options
+            ) as stream:
+                async for text in stream.text_stream:
+                    for suggestion in parser.feed(text):
+                        yield {'type': 'suggestion', 'suggestion': suggestion}
+                response = await stream.get_final_message()
+            
+            # Parse the structured response
+            analysis_result = self._build_result(response, protocol_text, filename, model)
+            if self._prompt_caching:
+                analysis_result['metadata']['cache_read_tokens'] = (
+                    getattr(response.usage, 'cache_read_input_tokens', 0) or 0
+                )
+            
+        except Exception as e:
+            analysis_result = {
+                'error': True,
+                'message': f"Analysis failed: {str(e)}",
+                'suggestions': []
+            }
+        
+        if not analysis_result.get('error'):
+            await self._cache_set(cache_key, analysis_result, protocol_text, model)
+        
+        yield {'type': 'result', 'result': analysis_result}
+    
+    async def analyze_protocols_batch(self, 
+                                      items: List[Tuple[str, str]],
+                                      poll_interval: float = 10.0) -> List[Dict[str, Any]]:
+        """
+        Analyze several protocols through the Message Batches API and wait for the results
+        
+        Args:
+            items: List of (protocol_text, filename) tuples
+            poll_interval: Seconds to wait between status checks
+            
+        Returns:
+            List of analysis results, in the same order as items
+        """
+        
+        batch_id = await self.submit_batch(items)
+        
+        while True:
+            batch_result = await self.get_batch_results(batch_id, items)
+            if batch_result['status'] == 'ended':
+                return batch_result['results']
+            await asyncio.sleep(poll_interval)
+    
+    async def submit_batch(self, items: List[Tuple[str, str]]) -> str:
+        """
+        Submit protocols for analysis as one message batch
+        
+        Args:
+            items: List of (protocol_text, filename) tuples
+            
+        Returns:
+            The batch ID to poll with get_batch_results()
+        """
+        
+        # custom_id only allows [a-zA-Z0-9_-], so use the item index
+        batch = await self.client.messages.batches.create(
+            requests=[
+                {
+                    "custom_id": f"protocol-{index}",
+                    "params": self._analysis_params(
+                        self._create_analysis_prompt(text, filename),
+                        self._select_model(text)
+                    )
+                }
+                for index, (text, filename) in enumerate(items)
+            ]
+        )
+        
+        return batch.id
+    
+    async def get_batch_results(self, 
+                                batch_id: str, 
+                                items: List[Tuple[str, str]]) -> Dict[str, Any]:
+        """
+        Check a message batch and collect its results once it has ended
+        
+        Args:
+            batch_id: ID returned by submit_batch()
+            items: The same (protocol_text, filename) tuples that were submitted
+            
+        Returns:
+            Dictionary with the processing status and, once ended, the results
+        """
+        
+        batch = await self.client.messages.batches.retrieve(batch_id)
+        batch_result = {
+            'batch_id': batch_id,
+            'status': batch.processing_status,
+            'request_counts': batch.request_counts.model_dump(),
+            'results': []
+        }
+        
+        if batch.processing_status != 'ended':
+            return batch_result
+        
+        results = [None] * len(items)
+        async for entry in await self.client.messages.batches.results(batch_id):
+            index = int(entry.custom_id.rsplit('-', 1)[1])
+            protocol_text, filename = items[index]
+            
+            if entry.result.type != 'succeeded':
+                results[index] = {
+                    'error': True,
+                    'message': f"Analysis failed: batch request {entry.result.type}",
+                    'suggestions': []
+                }
+                continue
+            
+            model = self._select_model(protocol_text)
+            analysis_result = self._build_result(
+                entry.result.message, protocol_text, filename, model
+            )
+            analysis_result['metadata']['batch_id'] = batch_id
+            
+            # Make batched results available to later single analyses
+            if not analysis_result.get('error'):
+                prompt = self._create_analysis_prompt(protocol_text, filename)
+                await self._cache_set(
+                    self._cache_key(prompt, model), analysis_result, protocol_text, model
+                )
+            
+            results[index] = analysis_result
+        
+        batch_result['results'] = [
+            result if result is not None else {
+                'error': True,
+                'message': 'Analysis failed: no result returned for this protocol',
+                'suggestions': []
+            }
+            for result in results
+        ]
+        return batch_result
+    
+    def _latency_options(self) -> Dict[str, Any]:
+        """Extra request options for settings.LATENCY_MODE"""
+        
+        if settings.LATENCY_MODE != "optimized":
+            return {}
+        
+        if settings.ANTHROPIC_PLATFORM == "bedrock":
+            # Bedrock's InvokeModel equivalent of performanceConfig={"latency": "optimized"}
+            return {
+                "extra_headers": {"X-Amzn-Bedrock-PerformanceConfig-Latency": "optimized"}
+            }
+        
+        print("LATENCY_MODE=optimized is only available on Bedrock; using standard latency")
+        return {}
+    
+    def _select_model(self, protocol_text: str) -> str:
+        """
+        Pick the model for a protocol
+        
+        Short protocols with no hazard keywords go to the faster, cheaper
+        model; anything long or safety-sensitive uses the default model.
+        """
+        
+        if len(protocol_text) >= settings.ROUTING_MAX_CHARS:
+            return self.model
+        if protocol_text.count("\n") >= settings.ROUTING_MAX_LINES:
+            return self.model
+        
+        lowered = protocol_text.lower()
+        if any(keyword in lowered for keyword in settings.ROUTING_HAZARD_KEYWORDS):
+            return self.model
+        
+        return self.fast_model
+    
+    def _analysis_params(self, prompt: str, model: str) -> Dict[str, Any]:
+        """Build the Messages API parameters for an analysis request"""
+        return {
+            "model": model,
+            "max_tokens": settings.MAX_TOKENS,
+            "temperature": settings.TEMPERATURE,
+            "system": self._system_blocks,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ]
+        }
+    
+    def _cache_key(self, prompt: str, model: str) -> str:
+        """Result cache key for an analysis prompt"""
+        return LLMCache.make_key(
+            model, STATIC_RUBRIC + prompt, settings.TEMPERATURE
+        )
+    
+    async def _cache_get(self, 
+                         cache_key: str, 
+                         protocol_text: str, 
+                         model: str) -> Optional[Dict[str, Any]]:
+        """Look up a cached result; cache failures count as a miss"""
+        try:
+            return await asyncio.to_thread(
+                self.cache.get, cache_key, protocol_text, model
+            )
+        except Exception as e:
+            print(f"Result cache lookup failed: {e}")
+            return None
+    
+    async def _cache_set(self, 
+                         cache_key: str, 
+                         analysis_result: Dict[str, Any], 
+                         protocol_text: str, 
+                         model: str) -> None:
+        """Cache a result; failures are logged so the analysis is still returned"""
+        try:
+            await asyncio.to_thread(
+                self.cache.set, cache_key, analysis_result, protocol_text, model
+            )
+        except Exception as e:
+            print(f"Result cache store failed: {e}")
+    
+    def _build_result(self, 
+                      response, 
+                      protocol_text: str, 
+                      filename: str, 
+                      model: str) -> Dict[str, Any]:
+        """Parse a Claude message into an analysis result with metadata"""
+        
+        analysis_result = self._parse_analysis_response(response.content[0].text)
+        
+        analysis_result['metadata'] = {
+            'filename': filename,
+            'model_used': response.model,
+            # response.model can be a resolved or Bedrock ID, so route on the requested model
+            'model_routing': 'fast' if model == self.fast_model else 'default',
+            'protocol_length': len(protocol_text),
+            'tokens_used': response.usage.input_tokens + response.usage.output_tokens,
+            'cache_hit': False
+        }
+        
+        return analysis_result
+    
+    def _create_analysis_prompt(self, protocol_text: str, filename: str = "") -> str:
+        """Create the per-request part of the prompt (the rubric is sent as the system prompt)"""
+        
+        return _ANALYSIS_PROMPT_TEMPLATE.format_map({
+            'filename_line': f"Protocol File: {filename}" if filename else "",
+            'protocol_text': protocol_text
+        })
     
     def _parse_analysis_response(self, response_text: str) -> Dict[str, Any]:
         """Parse Claude's response into structured format"""
@@ -117,11 +516,16 @@ Provide your analysis in valid JSON format only, with no additional text before
         try:
             # Try to find JSON in the response
             json_start = response_text.find('{')
-            json_end = response_text.rfind('}') + 1
             
-            if json_start != -1 and json_end > json_start:
-                json_text = response_text[json_start:json_end]
-                analysis = json.loads(json_text)
+            if json_start != -1:
+                try:
+                    # Usual case: nothing follows the JSON object
+                    analysis = _loads(
+                        response_text[json_start:] if json_start else response_text
+                    )
+                except json.JSONDecodeError:
+                    # Trailing text: decode the first object and ignore the rest
+                    analysis, _ = _JSON_DECODER.raw_decode(response_text, json_start)
                 
                 # Ensure required fields exist
                 if 'suggestions' not in analysis:
@@ -131,11 +535,16 @@ Provide your analysis in valid JSON format only, with no additional text before
                 if 'total_issues' not in analysis:
                     analysis['total_issues'] = len(analysis['suggestions'])
                 
-                # Sort suggestions by priority
-                priority_order = {'HIGH': 0, 'MEDIUM': 1, 'LOW': 2}
-                analysis['suggestions'].sort(
-                    key=lambda x: priority_order.get(x.get('priority', 'LOW'), 3)
-                )
+                # Sort suggestions by priority, tagging each with its rank
+                # so the sort key is a C-level itemgetter
+                suggestions = analysis['suggestions']
+                for suggestion in suggestions:
+                    suggestion['_prio'] = _PRIORITY_ORDER.get(
+                        suggestion.get('priority', 'LOW'), _UNKNOWN_PRIORITY
+                    )
+                suggestions.sort(key=_PRIO_KEY)
+                for suggestion in suggestions:
+                    del suggestion['_prio']
                 
                 return analysis
             else:
@@ -155,9 +564,9 @@ Provide your analysis in valid JSON format only, with no additional text before
                 'raw_response': response_text
             }
     
-    def generate_improved_protocol(self, 
-                                   original_text: str, 
-                                   accepted_suggestions: List[Dict]) -> str:
+    async def generate_improved_protocol(self, 
+                                         original_text: str, 
+                                         accepted_suggestions: List[Dict]) -> str:
         """
         Generate an improved version of the protocol with accepted suggestions
         
@@ -173,25 +582,19 @@ Provide your analysis in valid JSON format only, with no additional text before
             return original_text
         
         # Create prompt for improvement
-        suggestions_text = "\n".join([
+        suggestions_text = "\n".join(
             f"- {s['location']}: {s['suggestion']}"
             for s in accepted_suggestions
-        ])
+        )
         
-        prompt = f"""You are a laboratory protocol editor. Please rewrite this protocol incorporating the following improvements:
-
-{suggestions_text}
-
-Maintain the original structure and style, but integrate these improvements naturally. Make the protocol clearer and safer while keeping it professional.
-
-Original Protocol:
-{original_text}
-
-Provide the improved protocol below:"""
+        prompt = _IMPROVE_PROMPT_TEMPLATE.format_map({
+            'suggestions_text': suggestions_text,
+            'original_text': original_text
+        })
 
         try:
-            response = self.client.messages.create(
-                model=self.model,
+            response = await self.client.messages.create(
+                model=self._select_model(original_text),
                 max_tokens=settings.MAX_TOKENS,
                 temperature=0.3,
                 messages=[
@@ -199,7 +602,8 @@ Provide the improved protocol below:"""
                         "role": "user",
                         "content": prompt
                     }
-                ]
+                ],
+                **self._request_options
             )
             
             improved_text = response.content[0].text
@@ -209,10 +613,25 @@ Provide the improved protocol below:"""
             print(f"Error generating improved protocol: {e}")
             return original_text
     
-    def quick_check(self) -> bool:
+    async def warm_up(self) -> None:
+        """Open a pooled connection to the API before the first real request"""
+        try:
+            if settings.ANTHROPIC_PLATFORM == "bedrock":
+                await self.quick_check()
+            else:
+                # Listing models is free, unlike a messages call
+                await self.client.models.list(limit=1)
+        except Exception as e:
+            print(f"API warm-up failed: {e}")
+    
+    async def close(self) -> None:
+        """Close the pooled HTTP connections"""
+        await self.client.close()
+    
+    async def quick_check(self) -> bool:
         """Quick check to verify API connection works"""
         try:
-            response = self.client.messages.create(
+            response = await self.client.messages.create(
                 model=self.model,
                 max_tokens=50,
                 messages=[
@@ -229,13 +648,13 @@ Provide the improved protocol below:"""
 
 
 # Test function
-if __name__ == "__main__":
+async def _main():
     print("Testing ProtocolAnalyzer...")
     
     analyzer = ProtocolAnalyzer()
     
     # Quick API check
-    if analyzer.quick_check():
+    if await analyzer.quick_check():
         print("✅ Claude API connection working")
     else:
         print("❌ Claude API connection failed")
@@ -258,7 +677,7 @@ if __name__ == "__main__":
     """
     
     print("\nAnalyzing sample protocol...")
-    result = analyzer.analyze_protocol(sample_protocol, "sample_pcr.txt")
+    result = await analyzer.analyze_protocol(sample_protocol, "sample_pcr.txt")
     
     if 'error' not in result:
         print(f"✅ Found {result.get('total_issues', 0)} issues")
@@ -267,3 +686,7 @@ if __name__ == "__main__":
             print(f"First suggestion: {result['suggestions'][0]['issue']}")
     else:
         print(f"❌ Analysis failed: {result.get('message', 'Unknown error')}")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
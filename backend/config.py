@@ -1,58 +1,138 @@
 # config.py - Configuration and settings for Protocol Improver
 
 import os
+from enum import IntEnum
+from types import MappingProxyType
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
+
+class Priority(IntEnum):
+    """Suggestion priorities, in sort order"""
+    HIGH = 0
+    MEDIUM = 1
+    LOW = 2
+
+
 class Settings:
     """Application settings and configuration"""
     
     # API Configuration
     ANTHROPIC_API_KEY: str = os.getenv("ANTHROPIC_API_KEY", "")
-    ANTHROPIC_MODEL: str = "claude-sonnet-4-20250514"  # Latest Claude model
+    ANTHROPIC_MODEL: str = os.getenv("ANTHROPIC_MODEL", "claude-sonnet-4-20250514")  # Latest Claude model
+    ANTHROPIC_FAST_MODEL: str = os.getenv("ANTHROPIC_FAST_MODEL", "claude-haiku-4-5-20251001")  # Used for short, simple protocols
+    
+    # "anthropic" for the direct API, "bedrock" for Amazon Bedrock (needs anthropic[bedrock]
+    # and Bedrock model IDs in ANTHROPIC_MODEL / ANTHROPIC_FAST_MODEL)
+    ANTHROPIC_PLATFORM: str = os.getenv("ANTHROPIC_PLATFORM", "anthropic")
+    AWS_REGION: str = os.getenv("AWS_REGION", "us-east-2")
+    
+    # "optimized" requests latency-optimized inference where the platform supports it
+    LATENCY_MODE: str = os.getenv("LATENCY_MODE", "standard")
+    
+    # HTTP Connection Settings
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 60.0
+    HTTP_TIMEOUT_SECONDS: float = 300.0  # Non-streamed 4000-token responses can take minutes
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = 5.0
     
     # File Upload Settings
     MAX_FILE_SIZE_MB: int = 10  # Maximum file size in megabytes
-    ALLOWED_EXTENSIONS: set = {".pdf", ".docx", ".doc"}
+    MAX_BATCH_FILES: int = 10  # Files per /api/analyze_batch request
+    ALLOWED_EXTENSIONS: frozenset = frozenset({".pdf", ".docx", ".doc"})
+    # Leading bytes each extension must start with. .doc files are read with
+    # python-docx, which only understands the zip-based Word format
+    FILE_SIGNATURES: MappingProxyType = MappingProxyType({
+        ".pdf": (b"%PDF-",),
+        ".docx": (b"PK\x03\x04",),
+        ".doc": (b"PK\x03\x04",)
+    })
+    # Legacy Word 97-2003 (OLE compound file) documents, rejected with a hint
+    LEGACY_DOC_SIGNATURE: bytes = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
     UPLOAD_FOLDER: str = "../uploads"
+    KEEP_UPLOADS: bool = os.getenv("KEEP_UPLOADS", "true").lower() == "true"  # Save a copy of each upload
     OUTPUT_FOLDER: str = "../outputs"
+    CACHE_FOLDER: str = "../cache"  # Not served by /api/download
     
     # Analysis Settings
     MAX_TOKENS: int = 4000  # Maximum tokens for Claude response
     TEMPERATURE: float = 0.3  # Lower = more focused, higher = more creative
+    PROMPT_CACHE_MIN_TOKENS: int = 1024  # Smallest prefix Anthropic will cache (more for some models)
     
-    # Priority Levels
-    PRIORITY_HIGH: str = "HIGH"
-    PRIORITY_MEDIUM: str = "MEDIUM"
-    PRIORITY_LOW: str = "LOW"
+    # Model Routing (protocols under both limits and without hazard keywords use the fast model)
+    ROUTING_MAX_CHARS: int = 2000
+    ROUTING_MAX_LINES: int = 40
+    ROUTING_HAZARD_KEYWORDS: tuple = (
+        "carcinogen",
+        "hazard",
+        "bsl",
+        "biosafety",
+        "toxic",
+        "radioactive",
+        "flammable"
+    )
+    
+    # Response Cache Settings
+    CACHE_MAX_ENTRIES: int = 256  # Analyses kept in memory
+    CACHE_TTL_SECONDS: int = 24 * 60 * 60  # How long a cached analysis stays valid
+    CACHE_DB_PATH: str = os.path.join(CACHE_FOLDER, "results.sqlite")
+    CACHE_DB_MAX_ENTRIES: int = 10000  # Analyses kept on disk
+    SEMANTIC_CACHE_ENABLED: bool = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+    SEMANTIC_CACHE_MODEL: str = "all-MiniLM-L6-v2"  # Needs sentence-transformers installed
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95  # Minimum cosine similarity for a hit
+    
+    # Analysis Storage (results kept for /api/improve)
+    ANALYSIS_CACHE_MAX_ENTRIES: int = 1000
+    ANALYSIS_CACHE_TTL_SECONDS: int = 60 * 60
+    BATCH_JOB_TTL_SECONDS: int = 48 * 60 * 60  # Message batches can take up to 24 hours
+    REDIS_URL: str = os.getenv("REDIS_URL", "")  # Share storage across workers (needs redis)
+    
+    # Extracted Text Cache (keyed by a hash of the uploaded bytes)
+    EXTRACTION_CACHE_DIR: str = os.path.join(OUTPUT_FOLDER, ".cache")
+    EXTRACTION_CACHE_MAX_ENTRIES: int = 128
+    EXTRACTION_CACHE_DISK_MAX_ENTRIES: int = 1000
+    EXTRACTION_CACHE_TTL_SECONDS: int = 7 * 24 * 60 * 60
+    
+    # Priority Levels (names of the Priority enum above)
+    PRIORITY_HIGH: str = Priority.HIGH.name
+    PRIORITY_MEDIUM: str = Priority.MEDIUM.name
+    PRIORITY_LOW: str = Priority.LOW.name
     
     # Issue Categories
-    ISSUE_CATEGORIES = [
+    ISSUE_CATEGORIES: tuple = (
         "safety",
         "clarity",
         "completeness",
         "formatting",
         "best_practices"
-    ]
+    )
     
     @classmethod
     def validate(cls):
         """Validate that all required settings are present"""
-        if not cls.ANTHROPIC_API_KEY:
+        if cls.ANTHROPIC_PLATFORM not in ("anthropic", "bedrock"):
             raise ValueError(
-                "ANTHROPIC_API_KEY not found. Please add it to your .env file"
+                "ANTHROPIC_PLATFORM must be 'anthropic' or 'bedrock'"
             )
         
-        if not cls.ANTHROPIC_API_KEY.startswith("sk-ant-"):
-            raise ValueError(
-                "ANTHROPIC_API_KEY appears to be invalid. It should start with 'sk-ant-'"
-            )
+        # Bedrock authenticates with AWS credentials instead of an API key
+        if cls.ANTHROPIC_PLATFORM == "anthropic":
+            if not cls.ANTHROPIC_API_KEY:
+                raise ValueError(
+                    "ANTHROPIC_API_KEY not found. Please add it to your .env file"
+                )
+            
+            if not cls.ANTHROPIC_API_KEY.startswith("sk-ant-"):
+                raise ValueError(
+                    "ANTHROPIC_API_KEY appears to be invalid. It should start with 'sk-ant-'"
+                )
         
         # Create folders if they don't exist
         os.makedirs(cls.UPLOAD_FOLDER, exist_ok=True)
         os.makedirs(cls.OUTPUT_FOLDER, exist_ok=True)
+        os.makedirs(cls.CACHE_FOLDER, exist_ok=True)
         
         return True
 
@@ -0,0 +1,244 @@
+# llm_cache.py - Cache Claude analysis results to skip repeated API calls
+
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+try:
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+except ImportError:  # Semantic lookup is optional
+    np = None
+    SentenceTransformer = None
+
+
+class LLMCache:
+    """
+    Two-tier cache for parsed analysis results
+
+    Tier 1 is an exact match on a SHA-256 of (model, prompt, temperature),
+    held in an in-process LRU and optionally persisted to SQLite (expired
+    rows and rows beyond max_db_entries are pruned on every store).
+    Tier 2 embeds the protocol text and returns the result of a previously
+    analyzed protocol for the same model when the cosine similarity is above
+    a threshold. Texts longer than the embedding model's input window are
+    never matched this way, since truncated embeddings only see their start.
+    """
+
+    def __init__(self,
+                 max_entries: int = 256,
+                 ttl_seconds: int = 86400,
+                 db_path: Optional[str] = None,
+                 max_db_entries: int = 10000,
+                 semantic: bool = True,
+                 embedding_model: str = "all-MiniLM-L6-v2",
+                 similarity_threshold: float = 0.95):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_db_entries = max_db_entries
+        self.similarity_threshold = similarity_threshold
+
+        # key -> (created_at, result)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Persistent store
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, "
+                "response_json TEXT NOT NULL, "
+                "created_at REAL NOT NULL, "
+                "hits INTEGER NOT NULL DEFAULT 0)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS llm_cache_created_at "
+                "ON llm_cache (created_at)"
+            )
+            self._db.commit()
+
+        # Semantic tier (only when sentence-transformers is installed)
+        self._semantic = semantic and SentenceTransformer is not None
+        self._embedding_model_name = embedding_model
+        self._embedder = None
+        self._vector_keys = []
+        self._vector_models = []
+        self._vectors = None
+
+    @staticmethod
+    def make_key(model: str, prompt: str, temperature: float) -> str:
+        """Build the exact-match cache key for a request"""
+        payload = json.dumps(
+            {"model": model, "prompt": prompt, "temperature": temperature},
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str, text: str = "", model: str = "") -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached result
+
+        Args:
+            key: Exact-match key from make_key()
+            text: Protocol text, used for the similarity lookup on a miss
+            model: Model the result must come from for a similarity hit
+
+        Returns:
+            A copy of the cached result, or None on a miss
+        """
+        result = self._get_exact(key)
+        if result is None and text and model and self._semantic:
+            similar_key = self._find_similar(text, model)
+            if similar_key is not None:
+                result = self._get_exact(similar_key)
+        return result
+
+    def set(self,
+            key: str,
+            result: Dict[str, Any],
+            text: str = "",
+            model: str = "") -> None:
+        """Store a result under the given key"""
+        response_json = json.dumps(result)
+        created_at = time.time()
+
+        with self._lock:
+            self._entries[key] = (created_at, response_json)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted_key, _ = self._entries.popitem(last=False)
+                self._forget_vector(evicted_key)
+
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache "
+                    "(key, response_json, created_at, hits) VALUES (?, ?, ?, 0)",
+                    (key, response_json, created_at)
+                )
+                # Drop expired rows and keep only the newest max_db_entries
+                self._db.execute(
+                    "DELETE FROM llm_cache WHERE created_at < ?",
+                    (created_at - self.ttl_seconds,)
+                )
+                self._db.execute(
+                    "DELETE FROM llm_cache WHERE key NOT IN ("
+                    "SELECT key FROM llm_cache ORDER BY created_at DESC LIMIT ?)",
+                    (self.max_db_entries,)
+                )
+                self._db.commit()
+
+        if text and model and self._semantic:
+            self._add_vector(key, text, model)
+
+    def _get_exact(self, key: str) -> Optional[Dict[str, Any]]:
+        """Exact-match lookup in memory, then on disk"""
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created_at, response_json = entry
+                if now - created_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self._record_hit(key)
+                    return json.loads(response_json)
+                del self._entries[key]
+                self._forget_vector(key)
+
+            if self._db is None:
+                return None
+
+            row = self._db.execute(
+                "SELECT response_json, created_at FROM llm_cache WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            response_json, created_at = row
+            if now - created_at > self.ttl_seconds:
+                self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+
+            # Promote to memory
+            self._entries[key] = (created_at, response_json)
+            while len(self._entries) > self.max_entries:
+                evicted_key, _ = self._entries.popitem(last=False)
+                self._forget_vector(evicted_key)
+            self._record_hit(key)
+            return json.loads(response_json)
+
+    def _record_hit(self, key: str) -> None:
+        """Increment the persisted hit counter (caller holds the lock)"""
+        if self._db is not None:
+            self._db.execute(
+                "UPDATE llm_cache SET hits = hits + 1 WHERE key = ?", (key,)
+            )
+            self._db.commit()
+
+    def _embed(self, text: str):
+        """
+        Return a unit-length embedding of the text, or None if the text
+        does not fit in the embedding model's input window
+        """
+        if self._embedder is None:
+            self._embedder = SentenceTransformer(self._embedding_model_name)
+
+        # Two positions are taken by the [CLS] and [SEP] tokens
+        token_count = len(self._embedder.tokenizer.tokenize(text))
+        if token_count > self._embedder.max_seq_length - 2:
+            return None
+
+        return self._embedder.encode(text, normalize_embeddings=True)
+
+    def _find_similar(self, text: str, model: str) -> Optional[str]:
+        """Return the key of the most similar cached protocol, if close enough"""
+        with self._lock:
+            if model not in self._vector_models:
+                return None
+        query = self._embed(text)
+        if query is None:
+            return None
+        with self._lock:
+            if model not in self._vector_models:
+                return None
+            same_model = np.array([m == model for m in self._vector_models])
+            scores = np.where(same_model, np.dot(self._vectors, query), -1.0)
+            best = int(np.argmax(scores))
+            if scores[best] > self.similarity_threshold:
+                return self._vector_keys[best]
+        return None
+
+    def _add_vector(self, key: str, text: str, model: str) -> None:
+        """Index the protocol text for similarity lookups"""
+        vector = self._embed(text)
+        if vector is None:
+            return
+        with self._lock:
+            if key not in self._entries:
+                return
+            self._forget_vector(key)
+            self._vector_keys.append(key)
+            self._vector_models.append(model)
+            if self._vectors is None:
+                self._vectors = vector.reshape(1, -1)
+            else:
+                self._vectors = np.vstack([self._vectors, vector])
+
+    def _forget_vector(self, key: str) -> None:
+        """Drop a key from the similarity index (caller holds the lock)"""
+        if not self._semantic or key not in self._vector_keys:
+            return
+        index = self._vector_keys.index(key)
+        del self._vector_keys[index]
+        del self._vector_models[index]
+        self._vectors = np.delete(self._vectors, index, axis=0)
+        if not self._vector_keys:
+            self._vectors = None
@@ -1,16 +1,28 @@
 # main.py - FastAPI backend server for Protocol Improver (FIXED)
 
 from fastapi import FastAPI, File, UploadFile, HTTPException, Body
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from pathlib import Path
-import shutil
 from datetime import datetime
-from typing import List, Dict
+import secrets
+import time
+from typing import List, Dict, Optional
+import asyncio
+import io
 import json
+import aiofiles
 
-from text_extractor import TextExtractor
+# BLAKE3 hashes uploads at several GB/s; blake2b is the stdlib fallback
+try:
+    from blake3 import blake3 as content_hasher
+except ImportError:
+    from hashlib import blake2b as content_hasher
+
+from text_extractor import TextExtractor, ExtractionCache
 from analyzer import ProtocolAnalyzer
+from analysis_store import AnalysisStore
 from config import settings
 
 # Initialize FastAPI app
@@ -32,9 +44,47 @@ app.add_middleware(
 # Initialize services
 text_extractor = TextExtractor()
 analyzer = ProtocolAnalyzer()
+# Extracted text is only persisted to disk when uploads are kept too
+extraction_cache = ExtractionCache(
+    settings.EXTRACTION_CACHE_DIR if settings.KEEP_UPLOADS else None,
+    max_entries=settings.EXTRACTION_CACHE_MAX_ENTRIES,
+    max_disk_entries=settings.EXTRACTION_CACHE_DISK_MAX_ENTRIES,
+    ttl_seconds=settings.EXTRACTION_CACHE_TTL_SECONDS
+)
+
+# Store analysis results temporarily (bounded, and shared via Redis if configured)
+analysis_cache = AnalysisStore(
+    "analysis",
+    maxsize=settings.ANALYSIS_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.ANALYSIS_CACHE_TTL_SECONDS,
+    redis_url=settings.REDIS_URL
+)
+
+# Read uploads in 64KB chunks
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Submitted message batches and the protocols they contain
+batch_jobs = AnalysisStore(
+    "batch",
+    maxsize=settings.ANALYSIS_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.BATCH_JOB_TTL_SECONDS,
+    redis_url=settings.REDIS_URL
+)
+
+
+@app.on_event("startup")
+async def startup():
+    """Warm the API connection pool"""
+    await analyzer.warm_up()
+
 
-# Store analysis results temporarily (in production, use a database)
-analysis_cache = {}
+@app.on_event("shutdown")
+async def shutdown():
+    """Release worker processes and connections"""
+    text_extractor.close()
+    await analyzer.close()
+    await analysis_cache.close()
+    await batch_jobs.close()
 
 
 @app.get("/")
@@ -50,7 +100,7 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Detailed health check"""
-    api_working = analyzer.quick_check()
+    api_working = await analyzer.quick_check()
     
     return {
         "status": "healthy" if api_working else "degraded",
@@ -59,16 +109,12 @@ async def health_check():
     }
 
 
-@app.post("/api/upload")
-async def upload_protocol(file: UploadFile = File(...)):
+async def _validate_upload(file: UploadFile) -> str:
     """
-    Upload a protocol file for analysis
+    Check an upload's extension and leading bytes without reading the rest
     
-    Args:
-        file: PDF or DOCX file
-        
     Returns:
-        File information and extracted text preview
+        The lower-cased file extension
     """
     
     # Validate file extension
@@ -76,56 +122,126 @@ async def upload_protocol(file: UploadFile = File(...)):
     if file_ext not in settings.ALLOWED_EXTENSIONS:
         raise HTTPException(
             status_code=400,
-            detail=f"Invalid file type. Allowed: {', '.join(settings.ALLOWED_EXTENSIONS)}"
+            detail=f"Invalid file type. Allowed: {', '.join(sorted(settings.ALLOWED_EXTENSIONS))}"
         )
     
-    # Check file size (roughly)
-    file.file.seek(0, 2)  # Seek to end
-    file_size = file.file.tell()
-    file.file.seek(0)  # Reset to beginning
-    
-    if file_size > settings.MAX_FILE_SIZE_MB * 1024 * 1024:
+    # Check the leading bytes so mislabelled files are rejected before saving
+    head = await file.read(8)
+    await file.seek(0)
+    if head.startswith(settings.LEGACY_DOC_SIGNATURE):
+        raise HTTPException(
+            status_code=400,
+            detail="Legacy Word 97-2003 .doc files are not supported. Please save the file as .docx and upload it again"
+        )
+    if not head.startswith(settings.FILE_SIGNATURES[file_ext]):
         raise HTTPException(
             status_code=400,
-            detail=f"File too large. Maximum size: {settings.MAX_FILE_SIZE_MB}MB"
+            detail=f"File content does not match its {file_ext} extension"
         )
     
-    # Save uploaded file
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    safe_filename = f"{timestamp}_{file.filename}"
-    file_path = Path(settings.UPLOAD_FOLDER) / safe_filename
+    return file_ext
+
+
+async def _save_and_extract(file: UploadFile) -> Dict:
+    """
+    Validate an uploaded protocol, extract its full text and save a copy
+    
+    Returns:
+        Dictionary with text, metadata, filename (as saved, or None
+        when KEEP_UPLOADS is off), original_filename and file_size
+    """
+    
+    file_ext = await _validate_upload(file)
+    
+    # Read the upload into memory, hashing as it arrives and stopping
+    # as soon as it exceeds the size limit
+    max_size = settings.MAX_FILE_SIZE_MB * 1024 * 1024
+    file_size = 0
+    hasher = content_hasher()
+    buffer = io.BytesIO()
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        file_size += len(chunk)
+        if file_size > max_size:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File too large. Maximum size: {settings.MAX_FILE_SIZE_MB}MB"
+            )
+        hasher.update(chunk)
+        buffer.write(chunk)
+    # getvalue() hands over the buffer without copying it
+    data = buffer.getvalue()
+    buffer.close()
     
     try:
-        # Save file
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # Extract text
-        text, metadata = text_extractor.extract(file_path)
-        
-        # Create preview
-        preview = text_extractor.preview_text(text, max_chars=500)
-        
-        return {
-            "success": True,
-            "filename": safe_filename,
-            "original_filename": file.filename,
-            "file_size": file_size,
-            "text_length": len(text),
-            "preview": preview,
-            "metadata": metadata,
-            "message": "File uploaded and processed successfully"
-        }
-        
+        # Reuse the text of an identical earlier upload
+        digest = f"{hasher.hexdigest()}{file_ext}"
+        cached = await run_in_threadpool(extraction_cache.get, digest)
+        if cached is not None:
+            text, metadata = cached
+        else:
+            # Extract text from memory (CPU-bound, keep it off the event loop)
+            text, metadata = await run_in_threadpool(
+                text_extractor.extract_bytes, data, file_ext
+            )
+            await run_in_threadpool(extraction_cache.set, digest, text, metadata)
     except Exception as e:
-        # Clean up file if extraction failed
-        if file_path.exists():
-            file_path.unlink()
-        
         raise HTTPException(
             status_code=500,
             detail=f"Error processing file: {str(e)}"
         )
+    
+    # Keep a copy of the upload only once it is known to be readable
+    # (random suffix keeps same-second uploads apart)
+    safe_filename = None
+    if settings.KEEP_UPLOADS:
+        safe_filename = f"{int(time.time())}_{secrets.token_hex(3)}_{file.filename}"
+        try:
+            file_path = Path(settings.UPLOAD_FOLDER) / safe_filename
+            async with aiofiles.open(file_path, "wb") as out_file:
+                await out_file.write(data)
+        except OSError as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Error saving file: {str(e)}"
+            )
+    
+    return {
+        'text': text,
+        'metadata': metadata,
+        'filename': safe_filename,
+        'original_filename': file.filename,
+        'file_size': file_size
+    }
+
+
+@app.post("/api/upload")
+async def upload_protocol(file: UploadFile = File(...)):
+    """
+    Upload a protocol file for analysis
+    
+    Args:
+        file: PDF or DOCX file
+        
+    Returns:
+        File information and extracted text preview
+    """
+    
+    upload_result = await _save_and_extract(file)
+    text = upload_result['text']
+    
+    # Create preview
+    preview = text_extractor.preview_text(text, max_chars=500)
+    
+    return {
+        "success": True,
+        "filename": upload_result['filename'],
+        "original_filename": upload_result['original_filename'],
+        "file_size": upload_result['file_size'],
+        "text_length": len(text),
+        "preview": preview,
+        "metadata": upload_result['metadata'],
+        "message": "File uploaded and processed successfully"
+    }
 
 
 @app.post("/api/analyze")
@@ -141,20 +257,12 @@ async def analyze_protocol(file: UploadFile = File(...)):
     """
     
     # First, upload and extract text
-    upload_result = await upload_protocol(file)
-    
-    if not upload_result['success']:
-        raise HTTPException(status_code=500, detail="Failed to process file")
-    
-    # Get the saved file
-    file_path = Path(settings.UPLOAD_FOLDER) / upload_result['filename']
+    upload_result = await _save_and_extract(file)
+    text = upload_result['text']
     
     try:
-        # Extract full text
-        text, metadata = text_extractor.extract(file_path)
-        
         # Analyze with Claude
-        analysis_result = analyzer.analyze_protocol(
+        analysis_result = await analyzer.analyze_protocol(
             text, 
             upload_result['original_filename']
         )
@@ -165,28 +273,13 @@ async def analyze_protocol(file: UploadFile = File(...)):
                 detail=analysis_result.get('message', 'Analysis failed')
             )
         
-        # Generate unique analysis ID
-        analysis_id = f"{upload_result['filename']}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
-        
-        # Cache the results
-        analysis_cache[analysis_id] = {
-            'original_text': text,
-            'analysis': analysis_result,
-            'filename': upload_result['original_filename'],
-            'timestamp': datetime.now().isoformat()
-        }
-        
-        # Return analysis
-        return {
-            "success": True,
-            "analysis_id": analysis_id,
-            "filename": upload_result['original_filename'],
-            "summary": analysis_result.get('summary', ''),
-            "overall_score": analysis_result.get('overall_score', 'N/A'),
-            "total_issues": analysis_result.get('total_issues', 0),
-            "suggestions": analysis_result.get('suggestions', []),
-            "metadata": analysis_result.get('metadata', {})
-        }
+        # Cache the results and return the analysis
+        return await _store_analysis(
+            upload_result['filename'],
+            upload_result['original_filename'],
+            text,
+            analysis_result
+        )
         
     except HTTPException:
         raise
@@ -197,6 +290,218 @@ async def analyze_protocol(file: UploadFile = File(...)):
         )
 
 
+@app.post("/api/analyze/stream")
+async def analyze_protocol_stream(file: UploadFile = File(...)):
+    """
+    Analyze a protocol file, streaming suggestions as Server-Sent Events
+    
+    Args:
+        file: PDF or DOCX file
+        
+    Returns:
+        text/event-stream with one "suggestion" event per suggestion,
+        then a "complete" event with the same body as /api/analyze
+        (or an "error" event if the analysis failed)
+    """
+    
+    # Upload and extract before streaming so file errors return a normal status
+    upload_result = await _save_and_extract(file)
+    text = upload_result['text']
+    
+    async def event_stream():
+        async for event in analyzer.stream_analysis(
+            text, 
+            upload_result['original_filename']
+        ):
+            if event['type'] == 'suggestion':
+                yield _sse_event('suggestion', event['suggestion'])
+                continue
+            
+            analysis_result = event['result']
+            if analysis_result.get('error'):
+                yield _sse_event('error', {
+                    "success": False,
+                    "message": analysis_result.get('message', 'Analysis failed')
+                })
+            else:
+                yield _sse_event('complete', await _store_analysis(
+                    upload_result['filename'],
+                    upload_result['original_filename'],
+                    text,
+                    analysis_result
+                ))
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+@app.post("/api/analyze_batch")
+async def analyze_protocol_batch(files: List[UploadFile] = File(...)):
+    """
+    Submit several protocol files for analysis as one message batch
+    
+    Args:
+        files: PDF or DOCX files
+        
+    Returns:
+        Batch ID to poll with /api/batch/{batch_id}
+    """
+    
+    if len(files) > settings.MAX_BATCH_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many files. Maximum per batch: {settings.MAX_BATCH_FILES}"
+        )
+    
+    # Reject the whole batch up front if any file is invalid
+    for file in files:
+        await _validate_upload(file)
+    
+    # Files are independent, so process them concurrently; if one fails,
+    # the task group cancels the rest
+    try:
+        async with asyncio.TaskGroup() as group:
+            tasks = [group.create_task(_save_and_extract(file)) for file in files]
+    except ExceptionGroup as errors:
+        raise errors.exceptions[0]
+    upload_results = [task.result() for task in tasks]
+    protocols = [
+        {
+            'text': upload_result['text'],
+            'filename': upload_result['filename'],
+            'original_filename': upload_result['original_filename']
+        }
+        for upload_result in upload_results
+    ]
+    
+    try:
+        batch_id = await analyzer.submit_batch(
+            [(p['text'], p['original_filename']) for p in protocols]
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error submitting batch: {str(e)}"
+        )
+    
+    await batch_jobs.set(batch_id, {
+        'protocols': protocols,
+        'response': None,
+        'timestamp': time.time()
+    })
+    
+    return {
+        "success": True,
+        "batch_id": batch_id,
+        "total_files": len(protocols),
+        "message": "Batch submitted for analysis"
+    }
+
+
+async def _store_analysis(saved_filename: Optional[str], 
+                          original_filename: str, 
+                          text: str, 
+                          analysis_result: Dict) -> Dict:
+    """Cache an analysis for /api/improve and build the response returned to the client"""
+    
+    # Generate unique analysis ID
+    analysis_id = f"{saved_filename or original_filename}_{time.time_ns():x}_{secrets.token_hex(4)}"
+    
+    await analysis_cache.set(analysis_id, {
+        'original_text': text,
+        'analysis': analysis_result,
+        'filename': original_filename,
+        'timestamp': time.time()
+    })
+    
+    return {
+        "success": True,
+        "analysis_id": analysis_id,
+        "filename": original_filename,
+        "summary": analysis_result.get('summary', ''),
+        "overall_score": analysis_result.get('overall_score', 'N/A'),
+        "total_issues": analysis_result.get('total_issues', 0),
+        "suggestions": analysis_result.get('suggestions', []),
+        "metadata": analysis_result.get('metadata', {})
+    }
+
+
+def _sse_event(event: str, data: Dict) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.get("/api/batch/{batch_id}")
+async def get_batch_status(batch_id: str):
+    """
+    Check a batch analysis and return its results once processing has ended
+    
+    Args:
+        batch_id: ID from /api/analyze_batch
+        
+    Returns:
+        Batch status, plus one analysis per file when finished
+    """
+    
+    job = await batch_jobs.get(batch_id)
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Batch not found. Please submit the protocols again."
+        )
+    
+    if job['response'] is not None:
+        return job['response']
+    
+    protocols = job['protocols']
+    
+    try:
+        batch_result = await analyzer.get_batch_results(
+            batch_id,
+            [(p['text'], p['original_filename']) for p in protocols]
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error checking batch: {str(e)}"
+        )
+    
+    if batch_result['status'] != 'ended':
+        return {
+            "success": True,
+            "batch_id": batch_id,
+            "status": batch_result['status'],
+            "request_counts": batch_result['request_counts']
+        }
+    
+    analyses = []
+    for protocol, analysis_result in zip(protocols, batch_result['results']):
+        if analysis_result.get('error'):
+            analyses.append({
+                "success": False,
+                "filename": protocol['original_filename'],
+                "message": analysis_result.get('message', 'Analysis failed')
+            })
+            continue
+        
+        # Cache each result so it can be used with /api/improve
+        analyses.append(await _store_analysis(
+            protocol['filename'],
+            protocol['original_filename'],
+            protocol['text'],
+            analysis_result
+        ))
+    
+    job['response'] = {
+        "success": True,
+        "batch_id": batch_id,
+        "status": batch_result['status'],
+        "request_counts": batch_result['request_counts'],
+        "analyses": analyses
+    }
+    await batch_jobs.set(batch_id, job)
+    return job['response']
+
+
 # FIXED: Changed to accept JSON body instead of query parameters
 @app.post("/api/improve")
 async def generate_improved_protocol(
@@ -223,13 +528,13 @@ async def generate_improved_protocol(
         )
     
     # Get cached analysis
-    if analysis_id not in analysis_cache:
+    cached = await analysis_cache.get(analysis_id)
+    if cached is None:
         raise HTTPException(
             status_code=404,
             detail="Analysis not found. Please analyze the protocol again."
         )
     
-    cached = analysis_cache[analysis_id]
     original_text = cached['original_text']
     all_suggestions = cached['analysis']['suggestions']
     
@@ -249,18 +554,19 @@ async def generate_improved_protocol(
     
     try:
         # Generate improved protocol
-        improved_text = analyzer.generate_improved_protocol(
+        improved_text = await analyzer.generate_improved_protocol(
             original_text,
             accepted_suggestions
         )
         
         # Save improved protocol
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_filename = f"improved_{cached['filename']}_{timestamp}.txt"
+        output_filename = (
+            f"improved_{cached['filename']}_{int(time.time())}_{secrets.token_hex(3)}.txt"
+        )
         output_path = Path(settings.OUTPUT_FOLDER) / output_filename
         
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(improved_text)
+        async with aiofiles.open(output_path, 'w', encoding='utf-8') as f:
+            await f.write(improved_text)
         
         return {
             "success": True,
@@ -291,7 +597,9 @@ async def download_file(filename: str):
     
     file_path = Path(settings.OUTPUT_FOLDER) / filename
     
-    if not file_path.exists():
+    # Only improved protocols are downloadable, never other files in the folder
+    is_improved = filename.startswith("improved_") and filename.endswith(".txt")
+    if not is_improved or file_path.name != filename or not file_path.is_file():
         raise HTTPException(
             status_code=404,
             detail="File not found"
@@ -310,19 +618,28 @@ async def get_stats():
     
     uploads_dir = Path(settings.UPLOAD_FOLDER)
     outputs_dir = Path(settings.OUTPUT_FOLDER)
+    cache_size = await analysis_cache.count()
     
     return {
         "total_uploads": len(list(uploads_dir.glob("*"))),
-        "total_analyses": len(analysis_cache),
-        "total_improved": len(list(outputs_dir.glob("*"))),
-        "cache_size": len(analysis_cache)
+        "total_analyses": cache_size,
+        "total_improved": len(list(outputs_dir.glob("improved_*"))),
+        "cache_size": cache_size
     }
 
 
 # Run with: uvicorn main:app --reload
 if __name__ == "__main__":
-    import uvicorn
+    import os
+    import sys
     print("🚀 Starting Protocol Improver API...")
     print("📍 API will be available at: http://localhost:8000")
     print("📚 API docs available at: http://localhost:8000/docs")
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Hand over to the uvicorn CLI so this file is imported as "main" rather
+    # than run as __main__: the PDF worker pool uses the spawn start method,
+    # which re-imports __main__ in every worker and would rebuild the app,
+    # analyzer and caches in each one
+    os.execv(sys.executable, [
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--host", "0.0.0.0", "--port", "8000"
+    ])
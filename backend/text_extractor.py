@@ -1,13 +1,145 @@
 # text_extractor.py - Extract text from PDF and DOCX files
 
 from pathlib import Path
-from typing import Tuple, Dict
+from typing import Tuple, Dict, List, Optional, Union
+from cachetools import TTLCache
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import io
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
 import pypdf
 from docx import Document
+from lxml import etree
+
+# PDFium (C++) extracts text several times faster than pure-Python pypdf;
+# pypdf is kept as the fallback when the binary wheel is unavailable
+try:
+    import pypdfium2
+except ImportError:
+    pypdfium2 = None
+
+PDF_BACKEND = 'pypdfium2' if pypdfium2 is not None else 'pypdf'
+
+# PDFium is not thread-safe, even across documents, so every in-process
+# call goes through this lock (worker processes each have their own)
+_PDFIUM_LOCK = threading.Lock()
+
+# Compiled XPath for DOCX text. Paragraphs include those inside table cells
+# and text boxes; Word stores every text box twice (mc:Choice and the
+# mc:Fallback copy for old readers), so the fallback copy is skipped. Run
+# content is selected in document order and rendered as python-docx's
+# Paragraph.text does (tabs, line breaks and non-breaking hyphens included)
+_W = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+_MC = 'http://schemas.openxmlformats.org/markup-compatibility/2006'
+_W_NS = {'w': _W, 'mc': _MC}
+_DOCX_PARAGRAPHS = etree.XPath(
+    './/w:p[not(ancestor::mc:Fallback)]', namespaces=_W_NS
+)
+_RUN_CONTENT = (
+    '*[self::w:t or self::w:tab or self::w:ptab or self::w:br'
+    ' or self::w:cr or self::w:noBreakHyphen]'
+)
+_DOCX_RUN_CONTENT = etree.XPath(
+    f'./w:r/{_RUN_CONTENT} | ./w:hyperlink/w:r/{_RUN_CONTENT}', namespaces=_W_NS
+)
+_DOCX_FIXED_TEXT = {
+    f'{{{_W}}}tab': '\t',
+    f'{{{_W}}}ptab': '\t',
+    f'{{{_W}}}cr': '\n',
+    f'{{{_W}}}noBreakHyphen': '-'
+}
+_W_T = f'{{{_W}}}t'
+_W_BR = f'{{{_W}}}br'
+_W_BR_TYPE = f'{{{_W}}}type'
+
+
+def _docx_paragraph_text(para) -> str:
+    """Text of one w:p element, rendered like python-docx's Paragraph.text"""
+    parts = []
+    for element in _DOCX_RUN_CONTENT(para):
+        tag = element.tag
+        if tag == _W_T:
+            parts.append(element.text or '')
+        elif tag == _W_BR:
+            # Page and column breaks have no text equivalent
+            if element.get(_W_BR_TYPE, 'textWrapping') == 'textWrapping':
+                parts.append('\n')
+        else:
+            parts.append(_DOCX_FIXED_TEXT[tag])
+    return ''.join(parts)
+
+
+# A PDF given as a file path or as its raw bytes
+PdfSource = Union[str, bytes]
+
+
+def _open_pypdf(source: PdfSource) -> pypdf.PdfReader:
+    return pypdf.PdfReader(io.BytesIO(source) if isinstance(source, bytes) else source)
+
+
+def _read_pdf_info(source: PdfSource) -> Tuple[int, Dict]:
+    """Return the page count and title/author of a PDF"""
+    if pypdfium2 is not None:
+        with _PDFIUM_LOCK:
+            pdf = pypdfium2.PdfDocument(source)
+            try:
+                info = pdf.get_metadata_dict()
+                return len(pdf), {
+                    'title': info.get('Title', ''),
+                    'author': info.get('Author', '')
+                }
+            finally:
+                pdf.close()
+    
+    pdf_reader = _open_pypdf(source)
+    info = {}
+    if pdf_reader.metadata:
+        info['title'] = pdf_reader.metadata.get('/Title', '')
+        info['author'] = pdf_reader.metadata.get('/Author', '')
+    return len(pdf_reader.pages), info
+
+
+def _extract_pdf_pages(source: PdfSource, start: int, stop: int) -> List[str]:
+    """Extract the text of pages [start, stop) of a PDF (runs in a worker)"""
+    if pypdfium2 is not None:
+        with _PDFIUM_LOCK:
+            pdf = pypdfium2.PdfDocument(source)
+            try:
+                return [
+                    pdf[i].get_textpage().get_text_range().replace('\r\n', '\n')
+                    for i in range(start, stop)
+                ]
+            finally:
+                pdf.close()
+    
+    pdf_reader = _open_pypdf(source)
+    return [pdf_reader.pages[i].extract_text() for i in range(start, stop)]
+
 
 class TextExtractor:
     """Extract text from various document formats"""
     
+    def __init__(self, max_workers: Optional[int] = None, parallel_min_pages: int = 8):
+        """
+        Args:
+            max_workers: Worker processes for PDF extraction (default: CPU count)
+            parallel_min_pages: PDFs with fewer pages are extracted in-process
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.parallel_min_pages = parallel_min_pages
+        self._executor = None
+    
+    def close(self):
+        """Shut down the PDF worker pool"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+    
     def extract(self, file_path: Path) -> Tuple[str, Dict]:
         """
         Extract text from a file based on its extension
@@ -21,38 +153,57 @@ class TextExtractor:
         file_extension = file_path.suffix.lower()
         
         if file_extension == '.pdf':
-            return self._extract_from_pdf(file_path)
-        elif file_extension in ['.docx', '.doc']:
+            return self._extract_from_pdf(str(file_path))
+        elif file_extension in ('.docx', '.doc'):
             return self._extract_from_docx(file_path)
         else:
             raise ValueError(f"Unsupported file format: {file_extension}")
     
-    def _extract_from_pdf(self, file_path: Path) -> Tuple[str, Dict]:
+    def extract_bytes(self, data: bytes, file_extension: str) -> Tuple[str, Dict]:
+        """
+        Extract text from a document held in memory
+        
+        Args:
+            data: Raw file contents
+            file_extension: Extension the contents belong to, e.g. '.pdf'
+            
+        Returns:
+            Tuple of (extracted_text, metadata)
+        """
+        file_extension = file_extension.lower()
+        
+        if file_extension == '.pdf':
+            return self._extract_from_pdf(data)
+        elif file_extension in ('.docx', '.doc'):
+            return self._extract_from_docx(io.BytesIO(data))
+        else:
+            raise ValueError(f"Unsupported file format: {file_extension}")
+    
+    def _extract_from_pdf(self, source: PdfSource) -> Tuple[str, Dict]:
         """Extract text from PDF file"""
         try:
             text_parts = []
             metadata = {
                 'file_type': 'pdf',
                 'pages': 0,
-                'extraction_method': 'pypdf'
+                'extraction_method': PDF_BACKEND
             }
             
-            # Read PDF
-            with open(file_path, 'rb') as file:
-                pdf_reader = pypdf.PdfReader(file)
-                metadata['pages'] = len(pdf_reader.pages)
-                
-                # Extract text from each page
-                for page_num, page in enumerate(pdf_reader.pages, 1):
-                    page_text = page.extract_text()
-                    if page_text.strip():
-                        text_parts.append(f"\n--- Page {page_num} ---\n")
-                        text_parts.append(page_text)
-                
-                # Get PDF metadata if available
-                if pdf_reader.metadata:
-                    metadata['title'] = pdf_reader.metadata.get('/Title', '')
-                    metadata['author'] = pdf_reader.metadata.get('/Author', '')
+            # Read PDF page count and metadata
+            page_count, info = _read_pdf_info(source)
+            metadata['pages'] = page_count
+            metadata.update(info)
+            
+            # Extract text from each page, in parallel for long documents
+            if page_count >= self.parallel_min_pages and self.max_workers > 1:
+                page_texts = self._extract_pdf_pages_parallel(source, page_count)
+            else:
+                page_texts = _extract_pdf_pages(source, 0, page_count)
+            
+            for page_num, page_text in enumerate(page_texts, 1):
+                if page_text.strip():
+                    text_parts.append(f"\n--- Page {page_num} ---\n")
+                    text_parts.append(page_text)
             
             full_text = '\n'.join(text_parts)
             
@@ -64,10 +215,49 @@ class TextExtractor:
         except Exception as e:
             raise ValueError(f"Error extracting text from PDF: {str(e)}")
     
-    def _extract_from_docx(self, file_path: Path) -> Tuple[str, Dict]:
+    def _extract_pdf_pages_parallel(self, source: PdfSource, page_count: int) -> List[str]:
+        """Split a PDF into page ranges and extract them on the worker pool"""
+        
+        workers = min(self.max_workers, page_count)
+        chunk_size = -(-page_count // workers)  # Ceiling division
+        ranges = [
+            (start, min(start + chunk_size, page_count))
+            for start in range(0, page_count, chunk_size)
+        ]
+        
+        def run(executor):
+            futures = [
+                executor.submit(_extract_pdf_pages, source, start, stop)
+                for start, stop in ranges
+            ]
+            return [text for future in futures for text in future.result()]
+        
+        try:
+            return run(self._get_executor())
+        except (BrokenProcessPool, OSError):
+            # Drop the broken pool so the next document gets a fresh one
+            self.close()
+            if pypdfium2 is not None:
+                # PDFium is not thread-safe, so without processes run serially
+                return _extract_pdf_pages(source, 0, page_count)
+            
+            # Processes unavailable (e.g. sandboxed host): fall back to threads
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+            return run(self._executor)
+    
+    def _get_executor(self):
+        """Create the PDF worker pool on first use"""
+        if self._executor is None:
+            # spawn: forking a process that is running threads is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+    
+    def _extract_from_docx(self, source: Union[Path, io.BytesIO]) -> Tuple[str, Dict]:
         """Extract text from DOCX file"""
         try:
-            text_parts = []
             metadata = {
                 'file_type': 'docx',
                 'paragraphs': 0,
@@ -75,20 +265,16 @@ class TextExtractor:
             }
             
             # Read DOCX
-            doc = Document(file_path)
+            doc = Document(source)
             
-            # Extract text from paragraphs
-            for para in doc.paragraphs:
-                if para.text.strip():
-                    text_parts.append(para.text)
-                    metadata['paragraphs'] += 1
-            
-            # Extract text from tables
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        if cell.text.strip():
-                            text_parts.append(cell.text)
+            # Walk body, table and text box paragraphs in one lxml pass, in
+            # document order (unlike doc.paragraphs, text boxes are included)
+            paragraphs = (
+                _docx_paragraph_text(para)
+                for para in _DOCX_PARAGRAPHS(doc.element.body)
+            )
+            text_parts = [text for text in paragraphs if text.strip()]
+            metadata['paragraphs'] = len(text_parts)
             
             # Get document properties if available
             core_properties = doc.core_properties
@@ -122,6 +308,105 @@ class TextExtractor:
         return text[:max_chars] + "..."
 
 
+class ExtractionCache:
+    """
+    Cache extracted text keyed by a hash of the file contents
+    
+    Recent entries are kept in memory. When a cache_dir is given, entries are
+    also written to {cache_dir}/{digest}.json so re-uploads are served after
+    a restart; the directory keeps at most max_disk_entries files and files
+    older than ttl_seconds are treated as misses and removed.
+    """
+    
+    def __init__(self, 
+                 cache_dir: Optional[Path] = None, 
+                 max_entries: int = 128,
+                 max_disk_entries: int = 1000,
+                 ttl_seconds: int = 7 * 24 * 60 * 60):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_disk_entries = max_disk_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory = TTLCache(maxsize=max_entries, ttl=ttl_seconds)
+        self._lock = threading.Lock()
+    
+    def get(self, digest: str) -> Optional[Tuple[str, Dict]]:
+        """Return (text, metadata) for a content digest, or None"""
+        with self._lock:
+            entry = self._memory.get(digest)
+        
+        if entry is None:
+            entry = self._read_entry(digest)
+            if entry is None:
+                return None
+            with self._lock:
+                self._memory[digest] = entry
+        
+        return entry['text'], dict(entry['metadata'])
+    
+    def set(self, digest: str, text: str, metadata: Dict) -> None:
+        """Store extracted text and metadata for a content digest"""
+        entry = {'text': text, 'metadata': metadata}
+        with self._lock:
+            self._memory[digest] = entry
+        
+        if self.cache_dir is None:
+            return
+        
+        # Write to a unique temp file and rename, so concurrent writers of
+        # the same digest never leave a partial file behind. The disk copy
+        # is best-effort: the memory entry above still serves this process.
+        cache_file = self.cache_dir / f"{digest}.json"
+        temp_path = None
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(temp_path, cache_file)
+            self._prune()
+        except OSError as e:
+            print(f"Extraction cache write failed: {e}")
+            if temp_path is not None and os.path.exists(temp_path):
+                os.unlink(temp_path)
+    
+    def _read_entry(self, digest: str) -> Optional[Dict]:
+        """Load an entry from disk; missing, expired or unreadable files are misses"""
+        if self.cache_dir is None:
+            return None
+        
+        cache_file = self.cache_dir / f"{digest}.json"
+        try:
+            if time.time() - cache_file.stat().st_mtime > self.ttl_seconds:
+                cache_file.unlink(missing_ok=True)
+                return None
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            if not isinstance(entry, dict) or 'text' not in entry or 'metadata' not in entry:
+                return None
+            return entry
+        except (OSError, ValueError):
+            return None
+    
+    def _prune(self) -> None:
+        """Remove expired files and the oldest files beyond max_disk_entries"""
+        now = time.time()
+        files = []
+        for cache_file in self.cache_dir.glob('*.json'):
+            try:
+                mtime = cache_file.stat().st_mtime
+            except OSError:
+                continue
+            if now - mtime > self.ttl_seconds:
+                cache_file.unlink(missing_ok=True)
+            else:
+                files.append((mtime, cache_file))
+        
+        files.sort()
+        for _, cache_file in files[:max(0, len(files) - self.max_disk_entries)]:
+            cache_file.unlink(missing_ok=True)
+
+
 # Test function
 if __name__ == "__main__":
     # This runs when you execute: python text_extractor.py